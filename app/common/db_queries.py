@@ -56,12 +56,12 @@ def fetch_order_totals(process_numbers):
     if not process_numbers:
         return []
 
-    placeholders = ",".join(["%s"] * len(process_numbers))
-    sql = f"""
+    # One array parameter instead of an IN list with a placeholder per number
+    sql = """
         SELECT
             process_number,
             order_total
         FROM pzv_aftermarket.pzv_sales_order pso
-        WHERE process_number IN ({placeholders})
+        WHERE process_number = ANY(%s)
     """
-    return fetch_all_dicts(sql, tuple(process_numbers))
+    return fetch_all_dicts(sql, (list(process_numbers),))
@@ -1,3 +1,4 @@
+import asyncio
 
 from fastapi import APIRouter, Form, UploadFile, File
 
@@ -21,29 +22,47 @@ async def run_reconciliation(
     reconciliation_data = None
     csv_summary = None
 
-    try:
-        reconciliation_data = ReconciliationService.run_db_queries(business_date=business_date,logger=logger)
+    # DB queries and CSV parsing are independent: submit the queries to a
+    # worker thread first so the round trips overlap with the CSV parse.
+    db_future = asyncio.create_task(asyncio.to_thread(
+        ReconciliationService.run_db_queries,
+        business_date=business_date,
+        logger=logger
+    ))
 
-        shipped_count = len(reconciliation_data.get("asn_process_numbers", []))
+    try:
+        csv_summary = await asyncio.to_thread(
+            ReconciliationService.process_converge_files,
+            current_csv=current_batch_csv,
+            settled_csv=settled_batch_csv,
+            logger=logger
+        )
         logger.info(
-            "DB reconciliation completed | business_date=%s | shipped_orders=%s",
+            "CSV processed | business_date=%s | settled_batches=%s",
             business_date,
-            shipped_count
+            csv_summary.get("settled_batches", {}).get("total_rows", 0)
         )
     except Exception as e:
-        logger.exception("Reconciliation failed | business_date=%s", business_date)
+        logger.exception("CSV file  failed | business_date=%s", business_date)
+        logger.exception(e)
+        # Cancelling would not stop the worker thread, so let the DB queries
+        # finish and release their connections, and log a failure if any
+        db_result, = await asyncio.gather(db_future, return_exceptions=True)
+        if isinstance(db_result, Exception):
+            logger.error("Reconciliation failed | business_date=%s", business_date, exc_info=db_result)
         raise
 
     try:
-        csv_summary = ReconciliationService.process_converge_files(current_csv=current_batch_csv,settled_csv=settled_batch_csv,logger=logger)
+        reconciliation_data = await db_future
+
+        shipped_count = len(reconciliation_data.get("asn_process_numbers", []))
         logger.info(
-            "CSV processed | business_date=%s | settled_batches=%s",
+            "DB reconciliation completed | business_date=%s | shipped_orders=%s",
             business_date,
-            csv_summary.get("settled_batches", {}).get("total_rows", 0)
+            shipped_count
         )
     except Exception as e:
-        logger.exception("CSV file  failed | business_date=%s", business_date)
-        logger.exception(e)
+        logger.exception("Reconciliation failed | business_date=%s", business_date)
         raise
 
     try:
@@ -55,8 +74,10 @@ async def run_reconciliation(
         logger.exception("Reocniliation logic failed | business_date=%s", business_date)
         raise
 
-    # Excel generation
-    excel_io = ReconciliationService.generate_reconciliation_workbook(
+    # Excel generation: building and saving the workbook is blocking
+    # openpyxl work, so keep it off the event loop
+    excel_io = await asyncio.to_thread(
+        ReconciliationService.generate_reconciliation_workbook,
         business_date=business_date,
         reconciliation_data=reconciliation_data,
         csv_summary=csv_summary
@@ -65,7 +86,8 @@ async def run_reconciliation(
     encoded_filename = quote(filename)
     if not filename.endswith('.xlsx'):
         filename += '.xlsx'
-    excel_bytes = excel_io.getvalue()
+    # Zero-copy view of the serialized workbook; getvalue() would copy it
+    excel_bytes = excel_io.getbuffer()
 
     logger.info("Reconciliation completed  Successfully | business_date=%s", business_date)
 
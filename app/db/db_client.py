@@ -1,9 +1,14 @@
 from contextlib import contextmanager
+import threading
 
-from psycopg2.pool import SimpleConnectionPool
+from psycopg2.pool import ThreadedConnectionPool
 import os
 
-_pool: SimpleConnectionPool | None = None
+POOL_MAX_CONN = 10
+
+_pool: ThreadedConnectionPool | None = None
+# getconn() raises once maxconn is reached; block callers instead
+_pool_slots = threading.BoundedSemaphore(POOL_MAX_CONN)
 
 def init_pool():
     global _pool
@@ -19,9 +24,9 @@ def init_pool():
     if missing:
         raise RuntimeError(f"Missing DB env vars: {missing}")
 
-    _pool = SimpleConnectionPool(
+    _pool = ThreadedConnectionPool(
         minconn=1,
-        maxconn=10,
+        maxconn=POOL_MAX_CONN,
         host=os.getenv("DB_HOST"),
         port=int(os.getenv("DB_PORT")),
         dbname=os.getenv("DB_NAME"),
@@ -36,11 +41,12 @@ def get_db_connection():
     if _pool is None:
         raise RuntimeError("DB pool not initialized")
 
-    conn = _pool.getconn()
-    try:
-        yield conn
-    finally:
-        _pool.putconn(conn)
+    with _pool_slots:
+        conn = _pool.getconn()
+        try:
+            yield conn
+        finally:
+            _pool.putconn(conn)
 
 def close_pool():
     global _pool
@@ -1,17 +1,51 @@
-from datetime import datetime
+import codecs
 import csv
-import io
-from io import TextIOWrapper
-from collections import defaultdict
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
 from app.common import db_queries
-from app.db.db_client import get_db_connection
 from app.sheets.workbook_writer import ReconciliationWorkbookWriter
 
 
 
 
 
+CURRENT_BATCH_COLUMNS = (
+    "Invoice Number", "Auth Message", "Customer Full Name", "Transaction Date"
+)
+SETTLED_BATCH_COLUMNS = (
+    "Invoice Number", "Original Amount", "Transaction Status", "Original Transaction Type"
+)
+MAX_LOGGED_SKIPPED_ROWS = 50
+
+# Drops currency symbol and thousands separators in one pass: "$1,234.50"
+_AMOUNT_TBL = str.maketrans("", "", "$,")
+
+
+def _safe_float(value):
+    if isinstance(value, str):
+        value = value.translate(_AMOUNT_TBL).strip()
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _column_indices(header, columns):
+    """
+    Resolve column positions once from the CSV header row,
+    returned in the same order as `columns`.
+    A column absent from the header points one past the last header
+    column, so callers padding rows to `width` read it as "" like row.get
+    """
+    positions = {name.strip(): i for i, name in enumerate(header)}
+    absent = len(header)
+    return [positions.get(c, absent) for c in columns]
+
+
 def safe_log(logger, level, message):
     if logger:
         logger.log(level, message)
@@ -24,28 +58,37 @@ class ReconciliationService:
     # ================= DB QUERIES =================
     @staticmethod
     def run_db_queries(business_date: str, logger):
-        logger.info(f"Starting DB reconciliation for date {business_date}")
+        logger.info("Starting DB reconciliation for date %s", business_date)
 
-        logger.info("Running Query-1: Sales Orders")
-        sales_orders = db_queries.fetch_sales_orders(business_date)
-        logger.info( f"Query-1 completed | rows={len(sales_orders)}")
+        # Queries 1-3 are independent; each worker takes its own pooled
+        # connection. Query-4 depends on Query-3 and runs as soon as it lands.
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="db-query") as executor:
+            logger.info("Running Query-1: Sales Orders")
+            sales_orders_future = executor.submit(db_queries.fetch_sales_orders, business_date)
 
-        logger.info("Running Query-2: Order Items")
-        order_items = db_queries.fetch_order_items(business_date)
-        logger.info( f"Query-2 completed | rows={len(order_items)}")
+            logger.info("Running Query-2: Order Items")
+            order_items_future = executor.submit(db_queries.fetch_order_items, business_date)
 
-        logger.info( "Running Query-3: ASN Process Numbers")
-        asn_rows = db_queries.fetch_asn_process_numbers(business_date)
-        process_numbers = [row["process_number"] for row in asn_rows]
-        logger.info( f"Query-3 completed | rows={len(process_numbers)}")
+            logger.info( "Running Query-3: ASN Process Numbers")
+            asn_rows_future = executor.submit(db_queries.fetch_asn_process_numbers, business_date)
 
-        order_totals = []
-        if process_numbers:
-            logger.info( "Running Query-4: Order Totals")
-            order_totals = db_queries.fetch_order_totals(process_numbers)
-            logger.info( f"Query-4 completed | rows={len(order_totals)}")
-        else:
-            logger.warning( "Query-4 skipped (no ASN process numbers)")
+            asn_rows = asn_rows_future.result()
+            process_numbers = [row["process_number"] for row in asn_rows]
+            logger.info("Query-3 completed | rows=%s", len(process_numbers))
+
+            order_totals = []
+            if process_numbers:
+                logger.info( "Running Query-4: Order Totals")
+                order_totals = db_queries.fetch_order_totals(process_numbers)
+                logger.info("Query-4 completed | rows=%s", len(order_totals))
+            else:
+                logger.warning( "Query-4 skipped (no ASN process numbers)")
+
+            sales_orders = sales_orders_future.result()
+            logger.info("Query-1 completed | rows=%s", len(sales_orders))
+
+            order_items = order_items_future.result()
+            logger.info("Query-2 completed | rows=%s", len(order_items))
 
 
         return {
@@ -63,12 +106,25 @@ class ReconciliationService:
                 "total_rows": 0,
                 "valid_rows": 0,
                 "skipped_rows": 0,
-                "rows":[]
+                # columnar: one list per field, aligned by position
+                "rows": {
+                    "invoice": [],
+                    "auth_message": [],
+                    "customer": [],
+                    "transaction_date": []
+                }
             },
             "settled_batches": {
                 "total_rows": 0,
                 "transaction_type_breakdown": {},
-                "rows":[]
+                # invoice -> Original Amount of its first SALE row
+                "sale_amount_by_invoice": {},
+                "rows": {
+                    "invoice": [],
+                    "transaction_type": [],
+                    "amount": [],
+                    "status": []
+                }
             }
         }
 
@@ -77,62 +133,140 @@ class ReconciliationService:
             logger.info( "Processing CURRENTBATCHES CSV")
 
             current_csv.file.seek(0)
-            content = current_csv.file.read().decode("utf-8")
-            reader = csv.DictReader(io.StringIO(content))
-
-            for row_num, row in enumerate(reader, start=2):
-                csv_summary["current_batches"]["total_rows"] += 1
-
-                invoice = row.get("Invoice Number", "").strip()
-                auth_msg = row.get("Auth Message", "").strip()
-                customer = row.get("Customer Full Name", "").strip()
-                txn_date = row.get("Transaction Date", "").strip()
-
-                if not invoice or (txn_date and not (auth_msg or customer)):
-                    csv_summary["current_batches"]["skipped_rows"] += 1
-                    logger.warn(f"CURRENTBATCHES: Skipping row {row_num}")
-                    continue
-
-                csv_summary["current_batches"]["valid_rows"] += 1
-                csv_summary["current_batches"]["rows"].append({
-                    "invoice": invoice,
-                    "auth_message": auth_msg,
-                    "customer": customer,
-                    "transaction_date": txn_date
-                })
-
-            logger.info(f"CURRENTBATCHES summary: {csv_summary['current_batches']}")
+            # utf-8-sig: a BOM would otherwise stick to the first header name
+            reader = csv.reader(codecs.iterdecode(current_csv.file, "utf-8-sig"))
+            header = next(reader, [])
+            skipped_row_nums = []
+
+            # Hot loop: keep counters and bound methods in locals, write back after
+            current = csv_summary["current_batches"]
+            total = valid = skipped = 0
+
+            # An empty upload has no header and no rows
+            if header:
+                indices = _column_indices(header, CURRENT_BATCH_COLUMNS)
+                inv_i, auth_i, cust_i, date_i = indices
+                width = max(len(header), max(indices) + 1)
+                add_invoice = current["rows"]["invoice"].append
+                add_auth_message = current["rows"]["auth_message"].append
+                add_customer = current["rows"]["customer"].append
+                add_transaction_date = current["rows"]["transaction_date"].append
+                intern = sys.intern
+
+                for row_num, row in enumerate(reader, start=2):
+                    if not row:
+                        continue
+                    if len(row) < width:
+                        row.extend([""] * (width - len(row)))
+                    total += 1
+
+                    # Rows without an invoice (summary/blank lines) are rejected
+                    # before the remaining fields are stripped
+                    invoice = row[inv_i].strip()
+                    if invoice:
+                        txn_date = row[date_i].strip()
+                        auth_msg = row[auth_i].strip()
+                        customer = row[cust_i].strip()
+
+                        if not txn_date or auth_msg or customer:
+                            valid += 1
+                            add_invoice(intern(invoice))
+                            # Auth messages repeat across rows: share one object per value
+                            add_auth_message(intern(auth_msg) if auth_msg else "")
+                            add_customer(customer)
+                            add_transaction_date(txn_date)
+                            continue
+
+                    skipped += 1
+                    if len(skipped_row_nums) < MAX_LOGGED_SKIPPED_ROWS:
+                        skipped_row_nums.append(row_num)
+
+            current["total_rows"] = total
+            current["valid_rows"] = valid
+            current["skipped_rows"] = skipped
+
+            if skipped_row_nums:
+                logger.warning(
+                    "CURRENTBATCHES: Skipped rows | count=%s | first=%s",
+                    skipped,
+                    skipped_row_nums
+                )
+            logger.info(
+                "CURRENTBATCHES summary | total_rows=%s | valid_rows=%s | skipped_rows=%s",
+                total,
+                valid,
+                skipped
+            )
 
         # ---------- SETTLEDBATCHES ----------
         if settled_csv:
             logger.info("Processing SETTLEDBATCHES CSV")
 
-            txn_type_map = defaultdict(int)
+            # raw cell -> canonical type; the domain is a handful of values
+            canonical_txn_types = {}
             settled_csv.file.seek(0)
-            content = settled_csv.file.read().decode("utf-8")
-            reader = csv.DictReader(io.StringIO(content))
-
-            for row_num, row in enumerate(reader, start=2):
-                csv_summary["settled_batches"]["total_rows"] += 1
-
-                amount = row.get("Original Amount", "").strip()
-                invoice = row.get("Invoice Number", "").strip()
-                status= row.get("Transaction Status").strip()
-                txn_type = row.get("Original Transaction Type", "").strip().upper()
-                if not txn_type:
-                    txn_type = "UNKNOWN"
-
-                txn_type_map[txn_type] += 1
-
-                csv_summary["settled_batches"]["rows"].append({
-                    "invoice": invoice,
-                    "transaction_type": txn_type,
-                    "amount": amount,
-                    "status":status
-                })
-            csv_summary["settled_batches"]["transaction_type_breakdown"] = dict(txn_type_map)
-
-            logger.info(f"SETTLEDBATCHES summary: {csv_summary['settled_batches']}");
+            reader = csv.reader(codecs.iterdecode(settled_csv.file, "utf-8-sig"))
+            header = next(reader, [])
+
+            settled = csv_summary["settled_batches"]
+            add_invoice = settled["rows"]["invoice"].append
+            add_transaction_type = settled["rows"]["transaction_type"].append
+            add_amount = settled["rows"]["amount"].append
+            add_status = settled["rows"]["status"].append
+            sale_amount_by_invoice = {}
+            intern = sys.intern
+
+            # An empty upload has no header and no rows
+            if header:
+                indices = _column_indices(header, SETTLED_BATCH_COLUMNS)
+                inv_i, amount_i, status_i, type_i = indices
+                width = max(len(header), max(indices) + 1)
+
+                for row in reader:
+                    if not row:
+                        continue
+                    if len(row) < width:
+                        row.extend([""] * (width - len(row)))
+
+                    amount = row[amount_i].strip()
+                    invoice = row[inv_i].strip()
+                    if invoice:
+                        invoice = intern(invoice)
+                    status = row[status_i].strip()
+                    if status:
+                        status = intern(status)
+                    raw_txn_type = row[type_i]
+                    txn_type = canonical_txn_types.get(raw_txn_type)
+                    if txn_type is None:
+                        txn_type = raw_txn_type.strip()
+                        txn_type = txn_type.upper() if txn_type else "UNKNOWN"
+                        canonical_txn_types[raw_txn_type] = txn_type
+
+                    # Record the first parseable SALE amount per invoice while the
+                    # row is in hand, so the workbook step never rescans the rows;
+                    # a repeated SALE line must not double the settled amount, and
+                    # a blank invoice must not match a blank shipped number
+                    if invoice and txn_type == "SALE" and invoice not in sale_amount_by_invoice:
+                        sale_amount = _safe_float(amount)
+                        if sale_amount is not None:
+                            sale_amount_by_invoice[invoice] = sale_amount
+
+                    add_invoice(invoice)
+                    add_transaction_type(txn_type)
+                    add_amount(amount)
+                    add_status(status)
+
+            # One row is stored per non-blank line, so the tally is taken
+            # over the stored column in C instead of a per-row increment
+            settled["total_rows"] = len(settled["rows"]["transaction_type"])
+            settled["transaction_type_breakdown"] = dict(Counter(settled["rows"]["transaction_type"]))
+            settled["sale_amount_by_invoice"] = sale_amount_by_invoice
+
+            logger.info(
+                "SETTLEDBATCHES summary | total_rows=%s | transaction_type_breakdown=%s",
+                csv_summary["settled_batches"]["total_rows"],
+                csv_summary["settled_batches"]["transaction_type_breakdown"]
+            )
 
 
         return csv_summary
@@ -199,8 +333,31 @@ class ReconciliationService:
         )
 
         # Sheet 4: Orders Shipped
+        # Lookups are resolved here once instead of a VLOOKUP formula per row
+        converge_rows = csv_summary["current_batches"]["rows"]
+        converge_auth_by_invoice = {}
+        for invoice, auth_message in zip(converge_rows["invoice"], converge_rows["auth_message"]):
+            # first match wins, same as VLOOKUP
+            converge_auth_by_invoice.setdefault(invoice, auth_message)
+
+        # Converge invoices are already stripped strings; bring the DB keys
+        # to the same form once so every lookup below is a plain dict hit.
+        # NULL process numbers stay None so they render as empty cells
+        shipped_numbers = [
+            str(n).strip() if n is not None else None
+            for n in reconciliation_data["asn_process_numbers"]
+        ]
+        order_total_by_number = {
+            str(row["process_number"]).strip(): row["order_total"]
+            for row in reconciliation_data["order_totals"]
+            if row["process_number"] is not None
+        }
+
         writer.create_orders_shipped_sheet(
-            shipped_numbers=reconciliation_data["asn_process_numbers"]
+            shipped_numbers=shipped_numbers,
+            order_total_by_number=order_total_by_number,
+            converge_auth_by_invoice=converge_auth_by_invoice,
+            settled_amount_by_invoice=csv_summary["settled_batches"]["sale_amount_by_invoice"]
         )
 
         return writer.to_bytes()
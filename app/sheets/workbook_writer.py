@@ -1,7 +1,35 @@
 from datetime import datetime
+from itertools import zip_longest
+from operator import itemgetter
 from openpyxl import Workbook
 from io import BytesIO
-from openpyxl.utils import get_column_letter
+
+
+_SALES_ORDER_FIELDS = itemgetter(
+    "process_number", "notif_email", "order_date",
+    "order_state", "notify_mobile_no", "payment_reference_no"
+)
+_ORDER_ITEM_FIELDS = itemgetter("order_process_number", "order_status")
+
+# Fixed sheet headers, built once at import
+_CXP_HEADERS = (
+    "Process Number", "Email", "Order Date",
+    "Order State", "Mobile", "Payment Ref"
+)
+# Query-2 data (L–M) sits beside the sales orders, after a gap (G–K)
+_CXP_GAP = (None,) * 5
+_CXP_HEADER_ROW = _CXP_HEADERS + _CXP_GAP + ("Order Process Number", "Order Status")
+_CXP_EMPTY_ORDER = (None,) * len(_CXP_HEADERS)
+_CONVERGE_HEADERS = (
+    "Invoice Number", "Auth Message",
+    "Customer Name", "Transaction Date", ""
+)
+_CONVERGE_SETTLED_HEADERS = (
+    "Invoice Number", "Original Amount", "Transaction Status", "Original Transaction Type"
+)
+_ORDERS_SHIPPED_HEADERS = (
+    "Order Number", "Order Total", "Matching with converge", "Difference"
+)
 
 
 class ReconciliationWorkbookWriter:
@@ -11,9 +39,10 @@ class ReconciliationWorkbookWriter:
         business_date format: YYYY-MM-DD
         """
         self.business_date = business_date
-        self.workbook = Workbook()
-        default_sheet = self.workbook.active
-        self.workbook.remove(default_sheet)
+        # Write-only: rows are streamed to the XML writer as they are
+        # appended instead of being kept as Cell objects. Sheets can only be
+        # filled top-down with append(), and the workbook saved once.
+        self.workbook = Workbook(write_only=True)
 
     def get_filename(self) -> str:
         date_str = datetime.strptime(self.business_date, "%Y-%m-%d").strftime("%m-%d-%Y")
@@ -23,72 +52,77 @@ class ReconciliationWorkbookWriter:
     def create_cxp_sheet(self, sales_orders: list, order_items: list):
         sheet = self.workbook.create_sheet("CXP")
 
-        headers = [
-            "Process Number", "Email", "Order Date",
-            "Order State", "Mobile", "Payment Ref"
-        ]
-        sheet.append(headers)
-
-        for row in sales_orders:
-            sheet.append([
-                row["process_number"],
-                row["notif_email"],
-                row["order_date"],
-                row["order_state"],
-                row["notify_mobile_no"],
-                row["payment_reference_no"]
-            ])
-
-        # Query-2 data (L–M)
-        start_col = 12
-        sheet.cell(row=1, column=start_col, value="Order Process Number")
-        sheet.cell(row=1, column=start_col + 1, value="Order Status")
-
-        for idx, row in enumerate(order_items, start=2):
-            sheet.cell(row=idx, column=start_col, value=row["order_process_number"])
-            sheet.cell(row=idx, column=start_col + 1, value=row["order_status"])
+        sheet.append(_CXP_HEADER_ROW)
+
+        for order, item in zip_longest(sales_orders, order_items):
+            values = _CXP_EMPTY_ORDER if order is None else _SALES_ORDER_FIELDS(order)
+            if item is not None:
+                values = values + _CXP_GAP + _ORDER_ITEM_FIELDS(item)
+            sheet.append(values)
 
     # ================= SHEET 2: CONVERGE =================
-    def create_converge_sheet(self, converge_rows: list):
+    def create_converge_sheet(self, converge_rows: dict):
+        """
+        converge_rows: columnar dict of aligned lists
+        (invoice, auth_message, customer, transaction_date)
+        """
         sheet = self.workbook.create_sheet("Converge")
 
-        headers = [
-            "Invoice Number", "Auth Message",
-            "Customer Name", "Transaction Date",""
-        ]
-        sheet.append(headers)
+        sheet.append(_CONVERGE_HEADERS)
 
-        for row in converge_rows:
-            sheet.append([row.get("invoice"), row.get("auth_message"), row.get("customer"),row.get("transaction_date")])
+        for values in zip(
+                converge_rows["invoice"], converge_rows["auth_message"],
+                converge_rows["customer"], converge_rows["transaction_date"]
+        ):
+            sheet.append(values)
 
     # ================= SHEET 3: CONVERGE SETTLED =================
-    def create_converge_settled_sheet(self, settled_rows: list):
+    def create_converge_settled_sheet(self, settled_rows: dict):
+        """
+        settled_rows: columnar dict of aligned lists
+        (invoice, amount, status, transaction_type)
+        """
         sheet = self.workbook.create_sheet("Converge Settled")
 
-        headers = [
-            "Invoice Number", "Original Amount","Transaction Status", "Original Transaction Type"
-        ]
-        sheet.append(headers)
+        sheet.append(_CONVERGE_SETTLED_HEADERS)
 
-        for row in settled_rows:
-            sheet.append([row.get("invoice"), row.get("amount"),row.get("status"), row.get("transaction_type")])
+        for values in zip(
+                settled_rows["invoice"], settled_rows["amount"],
+                settled_rows["status"], settled_rows["transaction_type"]
+        ):
+            sheet.append(values)
 
     # ================= SHEET 4: ORDERS SHIPPED =================
-    def create_orders_shipped_sheet(self, shipped_numbers: list):
+    def create_orders_shipped_sheet(
+            self,
+            shipped_numbers: list,
+            order_total_by_number: dict,
+            converge_auth_by_invoice: dict,
+            settled_amount_by_invoice: dict
+    ):
+        """
+        Lookups are precomputed by the caller, so each row is plain values
+        rather than a VLOOKUP that Excel rescans Converge!A:A for on open.
+        Difference = order total - settled SALE amount, when both exist.
+        """
         sheet = self.workbook.create_sheet("Orders Shipped")
 
-        sheet.append(["Order Number", "Order Total", "Matching with converge","Difference"])
+        sheet.append(_ORDERS_SHIPPED_HEADERS)
 
+        for process_number in shipped_numbers:
+            order_total = order_total_by_number.get(process_number)
+            settled_amount = settled_amount_by_invoice.get(process_number)
 
-        for idx, process_number in enumerate(shipped_numbers, start=2):
-            sheet.cell(row=idx, column=1, value=process_number)
+            difference = None
+            if order_total is not None and settled_amount is not None:
+                difference = round(float(order_total) - settled_amount, 2)
 
-            # Excel VLOOKUP (bounded, efficient)
-            sheet.cell(
-                row=idx,
-                column=3,
-                value=f'=IF(A{idx}="","",VLOOKUP(A{idx},Converge!$A:$B,2,FALSE))'
-            )
+            sheet.append((
+                process_number,
+                order_total,
+                converge_auth_by_invoice.get(process_number, ""),
+                difference
+            ))
 
     # ================= SAVE =================
     def save(self, directory: str = "."):